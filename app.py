@@ -6,8 +6,30 @@ Paste Gurmukhi text → Get instant results with translations
 
 import streamlit as st
 import requests
+import heapq
+import json
+import os
 import re
-from difflib import SequenceMatcher
+import zlib
+from array import array
+from collections import Counter
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter, Retry
+
+# rapidfuzz scores whole batches in C++; without it scoring falls back to
+# a token-set Jaccard, which is cruder but still hash-set ops in C
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = process = None
+
+# orjson parses the banidb payloads with SIMD instead of pure Python;
+# fall back to requests' stdlib parser when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # ===== PAGE CONFIG =====
 st.set_page_config(
@@ -57,86 +79,478 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ===== HELPER FUNCTIONS =====
+@st.cache_resource
+def get_session():
+    """One pooled HTTP session so every API call reuses TCP/TLS connections"""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, backoff_factor=0.2)
+    ))
+    return session
+
+# Compiled once at import: whitespace collapse, halant strip and the
+# Gurmukhi-only filter all run in the C regex engine instead of a
+# per-character Python loop
+_WS_RE = re.compile(r'\s+')
+_HALANT_TABLE = str.maketrans('', '', '੍्')
+_NON_GURMUKHI_RE = re.compile(r'[^\u0A00-\u0A7F\s]')
+
+@lru_cache(maxsize=1024)
 def clean_gurmukhi_text(text):
-    """Clean Gurmukhi text"""
-    text = re.sub(r'\s+', ' ', text)
-    text = text.replace('੍', '').replace('्', '')
-    cleaned = ''.join(char for char in text if '\u0A00' <= char <= '\u0A7F' or char.isspace())
-    return cleaned.strip()
+    """Clean Gurmukhi text (memoized — query strings repeat across reruns)"""
+    text = _WS_RE.sub(' ', text).translate(_HALANT_TABLE)
+    return _NON_GURMUKHI_RE.sub('', text).strip()
 
-def search_gurbani(query_text, limit=15):
-    """Search SikhiToTheMax API for Gurmukhi text"""
+# Devanagari that survives the fast translate pass falls back to sanscript
+_DEV_RESIDUAL_RE = re.compile(r'[ऀ-ॿ]')
+
+@st.cache_resource(show_spinner=False)
+def _dev2gur_table():
+    """Codepoint translation table derived once from the sanscript schemes
+
+    Devanagari→Gurmukhi is almost a 1:1 mapping between the U+0900 and
+    U+0A00 blocks, so one C-level str.translate covers the common case
+    without sanscript's per-call scheme dispatch.
+    """
+    from indic_transliteration import sanscript
+    from indic_transliteration.sanscript import transliterate
+    table = {}
+    for codepoint in range(0x0900, 0x0980):
+        src = chr(codepoint)
+        dst = transliterate(src, sanscript.DEVANAGARI, sanscript.GURMUKHI)
+        if dst and dst != src:
+            table[codepoint] = dst
+    return str.maketrans(table)
+
+@st.cache_resource(show_spinner="Loading Whisper model (first run only)...")
+def load_whisper_model():
+    """int8-quantized faster-whisper model, loaded once per server process
+
+    CTranslate2's int8 weights need ~4x less RAM than FP32 PyTorch and
+    decode 2-4x faster on CPU — small enough to run on Streamlit Cloud.
+    """
+    import numpy as np
+    from faster_whisper import WhisperModel
+    model = WhisperModel("small", device="cpu", compute_type="int8")
+    # Warm up on one second of silence so CTranslate2's lazy buffer
+    # allocation happens here, once per process, not on the first upload
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32),
+                                   language="pa", beam_size=1)
+    list(segments)
+    return model
+
+def transcribe_local(audio_source):
+    """Transcribe with the local model (fallback when no OpenAI key is set)
+
+    Accepts a path or a file-like object — faster-whisper decodes either
+    directly, so uploads never need to touch disk first.
+    """
+    model = load_whisper_model()
+    segments, _ = model.transcribe(audio_source, language="pa", vad_filter=True)
+    return " ".join(segment.text for segment in segments).strip()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def convert_to_gurmukhi(transcript):
+    """Devanagari → cleaned Gurmukhi (pure, so repeat transcripts are free)"""
+    gurmukhi = transcript.translate(_dev2gur_table())
+    if _DEV_RESIDUAL_RE.search(gurmukhi):
+        # Some Devanagari survived the table (multi-char conjunct) — let
+        # the full scheme-based transliterator handle it
+        from indic_transliteration import sanscript
+        from indic_transliteration.sanscript import transliterate
+        gurmukhi = transliterate(transcript, sanscript.DEVANAGARI, sanscript.GURMUKHI)
+    return clean_gurmukhi_text(gurmukhi)
+
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def fetch_verses(pattern):
+    """Fetch one banidb search pattern (cached so repeat queries skip the network)"""
+    response = get_session().get(
+        "https://api.banidb.com/v2/search",
+        params={
+            'q': pattern,
+            'searchtype': 'first-letters-anywhere',
+            'source': 'all',
+            'limit': 30
+        },
+        timeout=10
+    )
+    # Raise on HTTP errors so cache_data doesn't store an empty result for
+    # a failed request — like a timeout, a 4xx/5xx gets retried next click
+    response.raise_for_status()
+    if orjson is not None:
+        data = orjson.loads(response.content)
+    else:
+        data = response.json()
+    return data.get('verses', [])
+
+GURBANI_DB = "gurbani.json"
+GURBANI_SNAPSHOT = "gurbani.pkl"
+# Bumped whenever the snapshot layout changes so stale pickles are rebuilt
+_SNAPSHOT_VERSION = 5
+
+def _jaccard_scores(q_tokens, texts):
+    """Token-set Jaccard on rapidfuzz's 0-100 scale (fallback scorer)"""
+    scores = []
+    for text in texts:
+        v_tokens = frozenset(text.split())
+        union = len(q_tokens | v_tokens)
+        scores.append(100.0 * len(q_tokens & v_tokens) / union if union else 0.0)
+    return scores
+
+def _bloom_slot(token):
+    """Stable 8-bit Bloom slot for a token (crc32 survives pickling,
+    unlike hash() which is salted per process)"""
+    return zlib.crc32(token.encode('utf-8')) & 255
+
+@st.cache_resource(show_spinner=False)
+def _scoring_kernel():
+    """Compile the Numba scoring kernel once, or None when numba is absent
+
+    The kernel walks the corpus in CSR form (flat uint32 token ids plus
+    per-record offsets) and counts, per record, how many token ids have
+    their bit set in the query bitset — the same match_score the Counter
+    path computes, but as a tight parallel loop over integer arrays.
+    """
     try:
-        query_text = clean_gurmukhi_text(query_text)
-        words = [w for w in query_text.split() if len(w) > 1]
-        
-        if not words:
+        import numpy as np
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    @njit(parallel=True, cache=True)
+    def score(tokens_flat, tokens_off, bitset):
+        n = tokens_off.shape[0] - 1
+        scores = np.zeros(n, dtype=np.int32)
+        for i in prange(n):
+            count = 0
+            for j in range(tokens_off[i], tokens_off[i + 1]):
+                tid = tokens_flat[j]
+                if (bitset[tid >> 6] >> (tid & 63)) & 1:
+                    count += 1
+            scores[i] = count
+        return scores
+
+    return score
+
+@st.cache_resource(show_spinner="Loading local Gurbani database...")
+def load_database():
+    """Load the local database once and build a word → record inverted index
+
+    The index maps each Gurmukhi token to the indices of the records that
+    contain it, so a query only ever touches the handful of records sharing
+    a word with it instead of scanning all ~30k lines. The hot fields live
+    in parallel columns (texts in a list, page/line in int32 arrays) rather
+    than one dict per record, so candidate lookups touch flat buffers.
+
+    The parsed result is snapshotted to a pickle next to the JSON: on later
+    cold starts a single pickle.load replaces re-parsing ~135 MB of JSON.
+    """
+    import pickle
+    import numpy as np
+
+    if os.path.exists(GURBANI_SNAPSHOT) and \
+            os.path.getmtime(GURBANI_SNAPSHOT) >= os.path.getmtime(GURBANI_DB):
+        with open(GURBANI_SNAPSHOT, 'rb') as f:
+            payload = pickle.load(f)
+        if isinstance(payload, dict) and payload.get('version') == _SNAPSHOT_VERSION:
+            return payload
+
+    with open(GURBANI_DB, 'rb') as f:
+        raw = f.read()
+    data = _rehydrate_db(orjson.loads(raw) if orjson is not None else json.loads(raw))
+
+    gurmukhi_texts = [record.get('gurmukhi', '') for record in data]
+    # The preferred English translation never changes, so pick it once here
+    # instead of diving through the translations dict on every search hit;
+    # it also lets the bulky translations payload be dropped from memory
+    english_texts = [_pick_english(record) for record in data]
+    pages = np.array([record.get('page') or 0 for record in data], dtype=np.int32)
+    lines = np.array([record.get('line') or 0 for record in data], dtype=np.int32)
+    del data
+
+    # One pass builds both query structures: the inverted index for the
+    # Counter path, and the CSR layout (interned uint32 token ids plus
+    # per-record offsets) the optional Numba kernel iterates over
+    index = {}
+    vocab = {}
+    tokens_flat = array('I')
+    tokens_off = array('I', [0])
+    # 256-bit Bloom bitmap per record (4 uint64 lanes, ~1 MB total): lets
+    # a query estimate match counts for the whole corpus with one
+    # vectorized AND + popcount before touching anything exact
+    corpus_bits = np.zeros((len(gurmukhi_texts), 4), dtype=np.uint64)
+    one = np.uint64(1)
+    for idx, gurmukhi in enumerate(gurmukhi_texts):
+        tokens = set(clean_gurmukhi_text(gurmukhi).split())
+        for token in tokens:
+            if len(token) > 2:
+                index.setdefault(token, array('I')).append(idx)
+                tokens_flat.append(vocab.setdefault(token, len(vocab)))
+                slot = _bloom_slot(token)
+                corpus_bits[idx, slot >> 6] |= one << np.uint64(slot & 63)
+        tokens_off.append(len(tokens_flat))
+
+    payload = {
+        'version': _SNAPSHOT_VERSION,
+        'gurmukhi': gurmukhi_texts,
+        'english': english_texts,
+        'pages': pages,
+        'lines': lines,
+        'index': index,
+        'vocab': vocab,
+        'tokens_flat': np.frombuffer(tokens_flat, dtype=np.uint32),
+        'tokens_off': np.frombuffer(tokens_off, dtype=np.uint32),
+        'corpus_bits': corpus_bits,
+    }
+    with open(GURBANI_SNAPSHOT, 'wb') as f:
+        pickle.dump(payload, f, protocol=5)
+    return payload
+
+def _rehydrate_db(payload):
+    """Expand dictionary-encoded translation texts back into strings
+
+    convert_to_json.py stores {"strings": [...], "records": [...]} with
+    integer ids where translation texts repeat; older plain-list files
+    pass through untouched.
+    """
+    if not isinstance(payload, dict):
+        return payload
+    strings = payload['strings']
+    records = payload['records']
+    for record in records:
+        for trans_list in record.get('translations', {}).values():
+            for trans in trans_list:
+                trans['text'] = strings[trans['text']]
+    return records
+
+def _pick_english(record):
+    """Choose the preferred English translation for a record"""
+    en_list = record.get('translations', {}).get('en', [])
+    for trans in en_list:
+        if trans.get('asset') in ('SBMS', 'DSSK'):
+            return trans['text']
+    return en_list[0]['text'] if en_list else ''
+
+def search_local(query_text, limit=10):
+    """Search the local database through the inverted index"""
+    db = load_database()
+
+    query_words = [w for w in set(clean_gurmukhi_text(query_text).split()) if len(w) > 2]
+    if not query_words:
+        return []
+
+    import numpy as np
+
+    kernel = _scoring_kernel()
+    if kernel is not None:
+        vocab = db['vocab']
+        query_ids = [vocab[w] for w in query_words if w in vocab]
+        if not query_ids:
             return []
-        
-        results = []
-        
-        # Try different word combinations
-        search_patterns = [
-            " ".join(words[:6]),
-            " ".join(words[:4]),
-            " ".join(words[:3]),
-            " ".join(words[1:4]) if len(words) > 3 else None,
-            " ".join(words[-3:]) if len(words) > 3 else None,
-        ]
-        
-        for pattern in search_patterns:
-            if not pattern:
-                continue
-            
-            url = "https://api.banidb.com/v2/search"
-            params = {
-                'q': pattern,
-                'searchtype': 'first-letters-anywhere',
-                'source': 'all',
-                'limit': 30
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'verses' in data and data['verses']:
-                    for verse in data['verses']:
-                        gurmukhi = verse.get('verse', {}).get('gurmukhi', '')
-                        
-                        # Calculate similarity
-                        similarity = SequenceMatcher(None, query_text.lower(), gurmukhi.lower()).ratio()
-                        
-                        # Get English translation
-                        english = ""
-                        translations = verse.get('verse', {}).get('translation', {})
-                        if 'en' in translations:
-                            english = translations['en'].get('bdb', '')
-                        
-                        page = verse.get('verse', {}).get('pageNum', '')
-                        
-                        results.append({
-                            'gurmukhi': gurmukhi,
-                            'english': english,
-                            'page': page,
-                            'similarity': similarity
-                        })
-        
-        # Remove duplicates and sort by similarity
-        seen = set()
-        unique = []
-        for r in results:
-            if r['gurmukhi'] not in seen:
-                seen.add(r['gurmukhi'])
-                unique.append(r)
-        
-        unique.sort(key=lambda x: x['similarity'], reverse=True)
-        return unique[:limit]
-    
-    except Exception as e:
-        st.error(f"Search error: {e}")
+        bitset = np.zeros((len(vocab) >> 6) + 1, dtype=np.uint64)
+        for tid in query_ids:
+            bitset[tid >> 6] |= np.uint64(1) << np.uint64(tid & 63)
+        scores = kernel(db['tokens_flat'], db['tokens_off'], bitset)
+        # argpartition pulls the top `limit` scores out in O(n), then only
+        # that handful gets sorted — no full sort of ~30k scores
+        if limit < scores.shape[0]:
+            top = np.argpartition(scores, -limit)[-limit:]
+        else:
+            top = np.arange(scores.shape[0])
+        order = top[np.argsort(scores[top])[::-1]]
+        ranked = [(int(idx), int(scores[idx])) for idx in order if scores[idx] > 0]
+    elif hasattr(np, 'bitwise_count'):
+        # Bloom prefilter: one vectorized AND + popcount over the per-record
+        # bitmaps gives approximate match counts for the whole corpus; only
+        # the small top slice is then verified against the exact token ids
+        # (Bloom slots can collide, so the approximate score can run high)
+        qbits = np.zeros(4, dtype=np.uint64)
+        for word in query_words:
+            slot = _bloom_slot(word)
+            qbits[slot >> 6] |= np.uint64(1) << np.uint64(slot & 63)
+        approx = np.bitwise_count(db['corpus_bits'] & qbits).sum(axis=1)
+
+        take = min(limit * 4, approx.shape[0])
+        top = np.argpartition(approx, -take)[-take:]
+
+        vocab = db['vocab']
+        query_ids = {vocab[w] for w in query_words if w in vocab}
+        tokens_flat, tokens_off = db['tokens_flat'], db['tokens_off']
+        ranked = []
+        for idx in top:
+            idx = int(idx)
+            record_ids = tokens_flat[tokens_off[idx]:tokens_off[idx + 1]]
+            score = sum(1 for tid in record_ids if int(tid) in query_ids)
+            if score:
+                ranked.append((idx, score))
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        ranked = ranked[:limit]
+    else:
+        # Counter over the posting lists: the count per record index is
+        # exactly the number of query words it contains
+        candidates = Counter()
+        for word in query_words:
+            candidates.update(db['index'].get(word, ()))
+        ranked = candidates.most_common(limit)
+
+    results = []
+    for idx, match_score in ranked:
+        results.append({
+            'gurmukhi': db['gurmukhi'][idx],
+            'english': db['english'][idx],
+            'page': int(db['pages'][idx]),
+            'line': int(db['lines'][idx]),
+            'match_score': match_score
+        })
+    return results
+
+# Caching the whole search (on top of the per-pattern cache) means a repeat
+# query skips scoring and dedup too, not just the network
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def search_gurbani(query_text, limit=15):
+    """Search SikhiToTheMax API for Gurmukhi text
+
+    Raises on API failure instead of returning an error value: st.cache_data
+    does not store the result of a raising call, so a transient timeout is
+    retried on the next click rather than cached as an empty result for an
+    hour. Rendering (including the error) stays with the caller.
+    """
+    query_text = clean_gurmukhi_text(query_text)
+    words = [w for w in query_text.split() if len(w) > 1]
+
+    if not words:
         return []
 
+    # Deduplicate while collecting: one dict keyed on the verse text,
+    # keeping whichever copy scored highest across patterns
+    best_by_verse = {}
+
+    # Try different word combinations
+    search_patterns = [
+        " ".join(words[:6]),
+        " ".join(words[:4]),
+        " ".join(words[:3]),
+        " ".join(words[1:4]) if len(words) > 3 else None,
+        " ".join(words[-3:]) if len(words) > 3 else None,
+    ]
+    
+    patterns = [p for p in search_patterns if p]
+
+    # The patterns are independent network calls, so issue them together;
+    # total latency becomes one round-trip instead of one per pattern.
+    # Once any pattern produces a near-exact hit, stop waiting on the rest.
+    best_similarity = 0.0
+    with ThreadPoolExecutor(max_workers=len(patterns)) as executor:
+        futures = [executor.submit(fetch_verses, p) for p in patterns]
+        for future in as_completed(futures):
+            verses = future.result()
+            if not verses:
+                continue
+
+            # The same verse text always scores the same against this
+            # query, so anything an earlier batch already scored is
+            # dropped before the scorer ever sees it
+            fresh_pairs = [
+                (v, g) for v, g in
+                ((v, v.get('verse', {}).get('gurmukhi', '')) for v in verses)
+                if g not in best_by_verse
+            ]
+            if not fresh_pairs:
+                continue
+            verses = [v for v, _ in fresh_pairs]
+            gurmukhis = [g for _, g in fresh_pairs]
+
+            # Score the whole batch in one C call; token_set_ratio is also
+            # robust to word-order differences between the transcription
+            # and the canonical verse, unlike plain ratio. No .lower():
+            # Gurmukhi has no case, so it only reallocated every string.
+            if process is not None:
+                scores = process.cdist(
+                    [query_text],
+                    gurmukhis,
+                    scorer=fuzz.token_set_ratio,
+                    workers=-1
+                )[0]
+            else:
+                scores = _jaccard_scores(frozenset(words), gurmukhis)
+
+            for verse, gurmukhi, score in zip(verses, gurmukhis, scores):
+                similarity = score / 100.0
+                best_similarity = max(best_similarity, similarity)
+
+                existing = best_by_verse.get(gurmukhi)
+                if existing is not None and existing['similarity'] >= similarity:
+                    continue
+
+                # Get English translation
+                english = ""
+                translations = verse.get('verse', {}).get('translation', {})
+                if 'en' in translations:
+                    english = translations['en'].get('bdb', '')
+
+                page = verse.get('verse', {}).get('pageNum', '')
+
+                best_by_verse[gurmukhi] = {
+                    'gurmukhi': gurmukhi,
+                    'english': english,
+                    'page': page,
+                    'similarity': similarity
+                }
+
+            if best_similarity > 0.92:
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    # heapq.nlargest keeps a limit-sized heap instead of sorting every
+    # deduplicated candidate
+    return heapq.nlargest(limit, best_by_verse.values(),
+                          key=lambda x: x['similarity'])
+
+
+# Streamlit reruns the whole script on every widget interaction, so with
+# the cards pre-joined a rerun renders one cached st.markdown instead of
+# re-issuing dozens of element calls per result
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_results_html(results):
+    """Build one HTML string with all API result cards"""
+    parts = []
+    for i, result in enumerate(results, 1):
+        sim_pct = int(result['similarity'] * 100)
+
+        if sim_pct >= 85:
+            emoji, label = "🟢", "Exact Match"
+        elif sim_pct >= 70:
+            emoji, label = "🟡", "Good Match"
+        elif sim_pct >= 50:
+            emoji, label = "🟠", "Possible Match"
+        else:
+            emoji, label = "🔴", "Distant Match"
+
+        parts.append(f'<h3>{emoji} Result {i} - {label} ({sim_pct}%)</h3>')
+        parts.append(f'<div class="gurmukhi">{result["gurmukhi"]}</div>')
+        if result['english']:
+            parts.append(f'<div class="english">🇬🇧 {result["english"]}</div>')
+        parts.append(f'<div class="page-info">📄 Ang (Page) {result["page"]}</div>')
+        parts.append('<hr>')
+    return ''.join(parts)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_local_results_html(results):
+    """Build one HTML string with all local-search result cards"""
+    parts = []
+    for i, result in enumerate(results, 1):
+        stars = "⭐" * min(result['match_score'], 5)
+        parts.append(f'<h3>{stars} Result {i} (matched {result["match_score"]} word(s))</h3>')
+        parts.append(f'<div class="gurmukhi">{result["gurmukhi"]}</div>')
+        if result['english']:
+            parts.append(f'<div class="english">🇬🇧 {result["english"]}</div>')
+        parts.append(f'<div class="page-info">📄 Ang (Page) {result["page"]}, Line {result["line"]}</div>')
+        parts.append('<hr>')
+    return ''.join(parts)
+
 # ===== MAIN APP =====
 st.title("🙏 Gurbani Scripture Finder")
 st.markdown("**Listen to Gurbani → Get Gurmukhi Text → Search Scripture**")
@@ -162,19 +576,35 @@ with tab1:
         if st.button("🎤 Convert to Gurmukhi Text", type="primary", use_container_width=True):
             import tempfile
             import os
-            from indic_transliteration import sanscript
-            from indic_transliteration.sanscript import transliterate
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.m4a') as tmp:
-                tmp.write(audio_file.read())
-                tmp_path = tmp.name
-            
+            import shutil
+            from pathlib import Path
+
+            tmp_path = None
             try:
-                # Use OpenAI Whisper API
+                transcript = None
+
+                # Use OpenAI Whisper API when a key is configured, otherwise
+                # fall back to the local int8 faster-whisper model
                 openai_key = st.secrets.get("OPENAI_API_KEY", "")
                 if not openai_key:
-                    st.error("OpenAI API key not configured in Streamlit secrets")
+                    # The local model decodes file-like objects itself (PyAV),
+                    # so the upload goes straight from memory to the decoder —
+                    # no temp-file round-trip through disk
+                    audio_file.seek(0)
+                    with st.spinner("Transcribing locally with Whisper (int8)..."):
+                        transcript = transcribe_local(audio_file)
                 else:
+                    # The multipart upload re-reads the file, so stream the
+                    # upload to disk in chunks instead of materializing the
+                    # whole clip as one bytes object first. On Linux the
+                    # temp file lands on /dev/shm (RAM tmpfs) so the
+                    # write-then-reupload never touches the SSD
+                    tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+                    with tempfile.NamedTemporaryFile(delete=False, suffix='.m4a',
+                                                     dir=tmp_dir) as tmp:
+                        shutil.copyfileobj(audio_file, tmp, length=1024 * 1024)
+                        tmp_path = tmp.name
+
                     with st.spinner("Transcribing with OpenAI Whisper..."):
                         # Upload file to OpenAI Whisper
                         with open(tmp_path, 'rb') as audio:
@@ -185,48 +615,48 @@ with tab1:
                                 'language': 'pa',  # Punjabi
                                 'response_format': 'json'
                             }
-                            
-                            response = requests.post(
+
+                            response = get_session().post(
                                 'https://api.openai.com/v1/audio/transcriptions',
                                 headers=headers,
                                 files=files,
                                 data=data,
                                 timeout=60
                             )
-                        
+
                         if response.status_code == 200:
                             result = response.json()
                             transcript = result.get('text', '')
-                            
-                            if transcript:
-                                st.success(f"✅ Transcribed successfully!")
-                                
-                                # Convert to Gurmukhi
-                                with st.spinner("Converting to Gurmukhi..."):
-                                    gurmukhi = transliterate(transcript, sanscript.DEVANAGARI, sanscript.GURMUKHI)
-                                    gurmukhi = clean_gurmukhi_text(gurmukhi)
-                                
-                                st.success("✅ Converted to Gurmukhi")
-                                
-                                # Display result
-                                st.markdown("### Your Gurmukhi Text:")
-                                st.markdown(f'<div class="gurmukhi">{gurmukhi}</div>', unsafe_allow_html=True)
-                                
-                                # Copy button
-                                st.code(gurmukhi, language="text")
-                                st.markdown("☝️ **Copy the text above**")
-                                st.markdown("Then go to the **'Text Search'** tab and paste it to find matches!")
-                            else:
-                                st.warning("No speech detected in audio")
                         else:
                             st.error(f"API Error: {response.status_code} - {response.text}")
-                
+
+                if transcript:
+                    st.success(f"✅ Transcribed successfully!")
+
+                    # Convert to Gurmukhi
+                    with st.spinner("Converting to Gurmukhi..."):
+                        gurmukhi = convert_to_gurmukhi(transcript)
+
+                    st.success("✅ Converted to Gurmukhi")
+
+                    # Display result
+                    st.markdown("### Your Gurmukhi Text:")
+                    st.markdown(f'<div class="gurmukhi">{gurmukhi}</div>', unsafe_allow_html=True)
+
+                    # Copy button
+                    st.code(gurmukhi, language="text")
+                    st.markdown("☝️ **Copy the text above**")
+                    st.markdown("Then go to the **'Text Search'** tab and paste it to find matches!")
+                elif transcript is not None:
+                    st.warning("No speech detected in audio")
+
             except Exception as e:
                 st.error(f"Error: {e}")
             
             finally:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+                if tmp_path:
+                    # One syscall instead of a stat + unlink pair
+                    Path(tmp_path).unlink(missing_ok=True)
 
 # ===== TAB 2: SEARCH SCRIPTURE =====
 with tab2:
@@ -242,45 +672,70 @@ with tab2:
     
     if st.button("🔍 Search Scripture", type="primary", use_container_width=True):
         if search_text.strip():
-            with st.spinner("Searching..."):
-                results = search_gurbani(search_text, limit=15)
-            
+            # Session-scoped memo on top of the global cache_data layer:
+            # re-clicking with unchanged text re-renders without even the
+            # cache lookup/deserialize round-trip. Only successful searches
+            # are memoized (and search_gurbani raises instead of caching
+            # failures), so a re-click after a transient API error retries
+            search_error = None
+            last = st.session_state.get('last_search')
+            if last and last['query'] == search_text:
+                results = last['results']
+            else:
+                try:
+                    with st.spinner("Searching..."):
+                        results = search_gurbani(search_text, limit=15)
+                except Exception as e:
+                    results = []
+                    search_error = f"Search error: {e}"
+                else:
+                    st.session_state['last_search'] = {
+                        'query': search_text,
+                        'results': results,
+                    }
+
             st.markdown("---")
-            
-            if results:
+
+            if search_error:
+                st.error(search_error)
+            elif results:
                 st.success(f"✅ Found {len(results)} match(es)!")
-                st.markdown("")
-                
-                for i, result in enumerate(results, 1):
-                    sim_pct = int(result['similarity'] * 100)
-                    
-                    if sim_pct >= 85:
-                        emoji = "🟢"
-                        label = "Exact Match"
-                    elif sim_pct >= 70:
-                        emoji = "🟡"
-                        label = "Good Match"
-                    elif sim_pct >= 50:
-                        emoji = "🟠"
-                        label = "Possible Match"
-                    else:
-                        emoji = "🔴"
-                        label = "Distant Match"
-                    
-                    with st.container():
-                        st.markdown(f"### {emoji} Result {i} - {label} ({sim_pct}%)")
-                        st.markdown(f'<div class="gurmukhi">{result["gurmukhi"]}</div>', unsafe_allow_html=True)
-                        
-                        if result['english']:
-                            st.markdown(f'<div class="english">🇬🇧 {result["english"]}</div>', unsafe_allow_html=True)
-                        
-                        st.markdown(f'<div class="page-info">📄 Ang (Page) {result["page"]}</div>', unsafe_allow_html=True)
-                        st.divider()
+                st.markdown(render_results_html(results), unsafe_allow_html=True)
             else:
                 st.warning("No matches found")
         else:
             st.warning("Please paste Gurmukhi text to search")
 
+# ===== TAB 3: FAST LOCAL SEARCH =====
+with tab3:
+    st.markdown("### Fast Local Search")
+    st.markdown("Search the bundled Gurbani database directly — no internet needed")
+
+    if not os.path.exists(GURBANI_DB):
+        st.warning(f"Local database '{GURBANI_DB}' not found. Run convert_to_json.py first.")
+    else:
+        local_text = st.text_area(
+            "Paste Gurmukhi text here:",
+            placeholder="ਵਾਹਿਗੁਰੂ",
+            height=100,
+            label_visibility="collapsed",
+            key="local_search_text"
+        )
+
+        if st.button("⚡ Search Local Database", type="primary", use_container_width=True):
+            if local_text.strip():
+                results = search_local(local_text, limit=10)
+
+                st.markdown("---")
+
+                if results:
+                    st.success(f"✅ Found {len(results)} match(es)!")
+                    st.markdown(render_local_results_html(results), unsafe_allow_html=True)
+                else:
+                    st.warning("No matches found")
+            else:
+                st.warning("Please paste Gurmukhi text to search")
+
 # ===== FOOTER =====
 st.markdown("---")
 st.markdown("### 📱 Best Way to Use This App:")
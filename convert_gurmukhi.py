@@ -1,19 +1,13 @@
+from pathlib import Path
+
 from indic_transliteration import sanscript
 from indic_transliteration.sanscript import transliterate
 
-# Read transcription file
-with open('output/transcribed.txt', 'r', encoding='utf-8') as f:
-    lines = f.readlines()
-
-# Convert each line to Gurmukhi
-gurmukhi_lines = []
-for line in lines:
-    gurmukhi_line = transliterate(line.strip(), sanscript.DEVANAGARI, sanscript.GURMUKHI)
-    gurmukhi_lines.append(gurmukhi_line)
-
-# Save the Gurmukhi transcription
-with open('output/transcribed_gurmukhi.txt', 'w', encoding='utf-8') as f:
-    for line in gurmukhi_lines:
-        f.write(line + '\n')
+# Transliterate the whole transcription in one call: the per-line loop paid
+# sanscript's scheme setup for every line, and newlines pass through
+# untouched so the output is identical
+text = Path('output/transcribed.txt').read_text(encoding='utf-8')
+gurmukhi_text = transliterate(text, sanscript.DEVANAGARI, sanscript.GURMUKHI)
+Path('output/transcribed_gurmukhi.txt').write_text(gurmukhi_text, encoding='utf-8')
 
 print("Conversion to Gurmukhi done! Check output/transcribed_gurmukhi.txt")
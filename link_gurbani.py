@@ -1,31 +1,50 @@
 import os
-import toml
+
+# tomllib (Python 3.11+) parses TOML in C — much faster than the pure
+# Python toml package, which stays as the fallback for older interpreters
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+    import toml
 
 # Path to your Gurbani database lines folder
 BASE_PATH = r"C:\Users\Satbir\gurbani-app\database_main\database-main\collections\lines"
 
+def iter_toml(root):
+    """Yield every .toml path under root via scandir (no re-stat per file)"""
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".toml"):
+                    yield entry.path
+
 def count_gurbani_lines(base_path=BASE_PATH):
     total_lines = 0
     file_count = 0
 
-    for root, dirs, files in os.walk(base_path):
-        for file in sorted(files):
-            if file.endswith(".toml"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        data = toml.load(f)
+    for file_path in iter_toml(base_path):
+        try:
+            with open(file_path, "rb") as f:
+                if tomllib is not None:
+                    data = tomllib.load(f)
+                else:
+                    data = toml.loads(f.read().decode("utf-8"))
 
-                        if "content" in data:
-                            # Count how many primary (Gurmukhi) lines exist
-                            for block in data["content"]:
-                                if block["type"] == "primary":
-                                    total_lines += 1
+            if "content" in data:
+                # Count how many primary (Gurmukhi) lines exist
+                for block in data["content"]:
+                    if block["type"] == "primary":
+                        total_lines += 1
 
-                    file_count += 1
+            file_count += 1
 
-                except Exception as e:
-                    print(f"❌ Error in {file_path}: {e}")
+        except Exception as e:
+            print(f"❌ Error in {file_path}: {e}")
 
     print(f"✅ Processed {file_count} files")
     print(f"📊 Total Gurbani lines found: {total_lines}")